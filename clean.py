@@ -3,17 +3,25 @@ import re
 from argparse import ArgumentParser
 
 
-def clean_data(data_fn):
+def clean_data(data_fn, removed_fn=None):
     '''Clean the data in `data_fn` and write it to a '.cleaned' file.
 
     This function removes all blank lines and duplicate lines of data. It then
     sorts the data alphabetically and writes it to a file named
     '<data_fn>.cleaned', where '<data_fn>' is the name of the file passed into
     the function.
+
+    If `removed_fn` is given, the lemmas listed in `removed_fn` (e.g., by
+    `Extract.update()`) are dropped from the data, along with the declensions
+    that follow them.
     '''
     with open(data_fn, 'r+') as f:
         data = [line for line in f.readlines() if line != '\n']
-        start, data, end = data[0], sorted(list(set(data[1:-1]))), data[-1]
+
+    if removed_fn:
+        data = drop_lemmas(data, removed_fn)
+
+    start, data, end = data[0], sorted(list(set(data[1:-1]))), data[-1]
 
     # ---- start revisions ----
     # propose alternative splits in the cases where compounds underwent further
@@ -52,6 +60,37 @@ def clean_data(data_fn):
         f.write(start + ''.join(data) + end)
 
 
+def drop_lemmas(data, removed_fn):
+    '''Drop the lemmas listed in `removed_fn` from `data`.
+
+    Since `Extract` prints each lemma's declensions right after the lemma
+    (marked with an asterisk), a removed lemma's declensions are dropped too.
+    `data` must therefore still be in the order it was printed in.
+    '''
+    with open(removed_fn, 'r+') as f:
+        removed = set(line.rstrip('\n') for line in f)
+
+    splitter = re.compile(r' [:;] ')
+    kept = []
+    dropping = False
+
+    for line in data:
+        fields = splitter.split(line, 1)
+
+        # keep lines that aren't annotations (e.g., timestamps)
+        if len(fields) < 2:
+            kept.append(line)
+            continue
+
+        if fields[0].endswith('*'):
+            dropping = fields[0][:-1] in removed
+
+        if not dropping:
+            kept.append(line)
+
+    return kept
+
+
 def clean_errors(errors_fn):
     '''Clean the errors in `errors_fn` and write them to a '.cleaned' file.
 
@@ -124,10 +163,11 @@ def main():
     parser = ArgumentParser()
     parser.add_argument('-d', '--data_fn')
     parser.add_argument('-e', '--errors_fn')
+    parser.add_argument('-x', '--removed_fn', default=None)
     args = parser.parse_args()
 
     if args.data_fn:
-        clean_data(args.data_fn)
+        clean_data(args.data_fn, args.removed_fn)
 
     if args.errors_fn:
         clean_errors(args.errors_fn)
@@ -1,3 +1,16 @@
-__all__ = ['Extract', ]
+__all__ = [
+    'Annotation',
+    'Extract',
+    'Failure',
+    'PageCache',
+    'RetryQueue',
+    'Scheduler',
+    'Segmenter',
+    ]
 
 from .base import Extract
+from .pages import PageCache
+from .records import Annotation, Failure
+from .retry import RetryQueue
+from .schedule import Scheduler
+from .segment import Segmenter
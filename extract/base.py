@@ -1,19 +1,35 @@
 # -*- coding: utf-8 -*-
 
 import json
+import random
 import re
+import threading
+import time
 
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pytz import timezone, utc
 from sys import stderr, stdout
 from urllib.error import HTTPError, URLError
-from urllib.request import quote, urlopen
+from urllib.parse import urldefrag, urljoin
+from urllib.request import quote
 
 from bs4 import BeautifulSoup
 from jsmin import jsmin
 
 from lang import LANGUAGE_DATA, WIKI_EN_URL
 
+from .manifest import (
+    diff_manifests,
+    latest_manifest,
+    load_manifest,
+    save_manifest,
+    )
+from .pages import read_url
+from .records import Annotation, Failure
+from .schedule import LRUCache
+
 
 class Extract:
 
@@ -52,16 +68,26 @@ class Extract:
     # for extracting bad reconciliations
     TOO_SHORT_P = re.compile(r'(?:^|=|\+)\w{1,2}(?:$|=|\+)')
 
+    # for extracting the "next page" links in category listings
+    NEXT_PAGE_P = re.compile(r'[?&]pagefrom=')
+
     # for extracting words from a debug list
     DEBUG_WORD_P = re.compile(r'^([\w\s\d\-]+)(?: \(.+)?$', flags=re.M)
 
-    def __init__(self, lang, code, grammar_fn=None):
+    def __init__(self, lang, code, grammar_fn=None, pages=None,
+                 segmenter=None, retries=None, timeout=10, read_timeout=30,
+                 budget=None, base_url=WIKI_EN_URL, wiki_url=None,
+                 manifests=None, cache_size=0, scheduler=None):
         # set the language's name (`self.lang`) and 2-letter code (`self.code`)
         self.lang = lang
         self.code = code
 
+        # the English Wiktionary's url, e.g., https://en.wiktionary.org (this
+        # can be pointed at a stand-in server; see the `stub` package)
+        self.base_url = base_url.rstrip('/')
+
         # the language's Wiktionary url, e.g., https://fi.wiktionary.org/wiki/
-        self.wiki = LANGUAGE_DATA[self.code].get('wiki')
+        self.wiki = wiki_url or LANGUAGE_DATA[self.code].get('wiki')
 
         # the English Wiktionary's url to the language's lemmas
         self.lemmas = LANGUAGE_DATA[self.code]['lemmas']
@@ -81,7 +107,7 @@ class Extract:
 
         # the default starting url for scraping in `self.walk()`
         self.start_url = '%s/w/index.php?title=Category:%s_lemmas&from=%s' % (
-            WIKI_EN_URL, self.lang, grammar['first_letter'])
+            self.base_url, self.lang, grammar['first_letter'])
 
         # for any item in `grammar` whose key is entirely uppercase, store that
         # item on `self` (e.g., grammar['AFFIXES'] >>> self.affixes)
@@ -89,6 +115,39 @@ class Extract:
             if key.upper() == key:
                 setattr(self, key.lower(), grammar[key])
 
+        # an optional PageCache to record and replay fetched pages
+        self.pages = pages
+
+        # the affixes collected by `self.preload_affixes()`, from the English
+        # ('en') and the target language's ('native') Wiktionary
+        self.known_affixes = {'en': set(), 'native': set()}
+
+        # an optional Segmenter to classify known morphemes without fetching
+        # their pages
+        self.segmenter = segmenter
+
+        # an optional RetryQueue for words that failed due to network hiccups
+        self.retries = retries
+
+        # the seconds to wait on connecting to a host and on reading a page,
+        # and the seconds that can be spent on any single lemma (see
+        # `self.check_budget()`)
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        self.budget = budget
+
+        # an optional directory of lemma snapshots (see `self.update()`)
+        self.manifests = manifests
+
+        # an optional in-memory cache of the `cache_size` most recently
+        # fetched pages, and an optional Scheduler to order lemmas so that
+        # they hit that cache more often
+        self.cache = LRUCache(cache_size) if cache_size else None
+        self.scheduler = scheduler
+
+        # the deadline and stage of the lemma each thread is extracting
+        self.local = threading.local()
+
         # set printer methods...
         if stdout.encoding == 'UTF-8':
             self.print_error = self._print_error
@@ -101,47 +160,307 @@ class Extract:
     # scrape ------------------------------------------------------------------
 
     def walk(self, url):
-        '''Walk through Wiktionary, beginning with `url`.'''
+        '''Walk through Wiktionary, beginning with `url`.
+
+        If `self.manifests` is set and the walk covers every lemma (i.e., no
+        `url` is given), a snapshot of the lemmas is saved when the walk is
+        done (see `self.update()`).
+        '''
+        lemmas = []
+        pending = []
+        snapshot = self.manifests and not url
+
         if not url:
             url = self.start_url
             self.timestamp()
 
-        soup = BeautifulSoup(urlopen(url), 'html.parser')
-        page = soup.find_all('a', title='Category:%s lemmas' % self.lang)[-1]
-        words = soup.find('div', id='mw-pages') \
-            .find_all('div', class_='mw-category-group')
+        for page in self.iter_category(url):
+            pending.extend(page)
 
-        del soup
+            if snapshot:
+                lemmas.extend(page)
 
-        for div in words:
-            for a in div.find_all('a', string=Extract.MIN_WORD_P):
-                href = WIKI_EN_URL + a.get('href')
+            # with a scheduler, gather a full window of lemmas before walking
+            if not self.scheduler or len(pending) >= self.scheduler.window:
+                self.walk_lemmas(pending)
+                pending = []
 
-                try:
-                    self.extract(a.text,  href)
+        self.walk_lemmas(pending)
+        self.finish_walk()
 
-                # some errors aren't worth mentioning
-                except (HiccupError, SilentError):
-                    pass
+        if snapshot:
+            save_manifest(lemmas, self.manifests, self.code, self.base_url)
 
-                except Exception as error:
-                    self.print_error(a.text, href, error)
+    def walk_lemmas(self, lemmas):
+        '''Extract the (orth, href) tuples in `lemmas`.'''
+        if self.scheduler:
+            for i in range(0, len(lemmas), self.scheduler.window):
+                self.walk_scheduled(lemmas[i:i + self.scheduler.window])
 
-        if page.text == 'next page':
-            return self.walk(WIKI_EN_URL + page.get('href'))
+            return
 
-        else:
-            self.timestamp()
+        for orth, href in lemmas:
+            try:
+                self.extract(orth, href)
+
+            # some errors aren't worth mentioning
+            except SilentError:
+                pass
+
+            except Exception as error:
+                self.defer(orth, href, error)
+
+    def walk_scheduled(self, lemmas):
+        '''Extract the (orth, href) tuples in `lemmas` in scheduled order.
+
+        The lemmas are extracted in the order given by `self.scheduler`, but
+        their annotations are printed in the order of `lemmas`.
+        '''
+        results = {}
+
+        for orth, href in self.scheduler.order(lemmas):
+            # log the pages fetched for each lemma, to replay them through
+            # the scheduler's simulated caches
+            self.local.fetched = []
+            records = self.annotate_records(orth, href)
+            results[orth, href] = records, self.local.fetched
+            self.scheduler.replay(self.local.fetched, self.scheduler.scheduled)
+
+        self.local.fetched = None
+
+        for lemma in lemmas:
+            records, fetched = results[lemma]
+            self.scheduler.replay(fetched, self.scheduler.baseline)
+
+            for record in records:
+                if isinstance(record, Failure):
+                    self.defer(record.orth, record.url, record.error)
+
+                else:
+                    self.print_annotation(*record.fields())
+
+    def finish_walk(self):
+        '''Retry any deferred words, then print a timestamp and reports.'''
+        # retry the words that failed due to network hiccups
+        if self.retries is not None:
+            self.retry()
+
+        self.timestamp()
+
+        if self.segmenter:
+            print(self.segmenter.report(), file=stderr)
+
+        if self.scheduler:
+            print(self.scheduler.report(), file=stderr)
+
+        elif self.cache:
+            print('Cache: %.1f%% hit rate over %s fetches.' % (
+                self.cache.hit_rate(), self.cache.lookups), file=stderr)
+
+    def update(self, walk=True):
+        '''Walk through only the lemmas added since the last snapshot.
+
+        This method lists the target language's lemmas, compares them with
+        the latest snapshot in `self.manifests`, extracts the lemmas added
+        since, and then saves the lemmas as a new snapshot. The lemmas that
+        were removed since are written to a '<snapshot>.removed' file, one
+        per line, so that they can be dropped from earlier output (see
+        `clean.py`). The snapshot is only saved once the walk is finished, so
+        that an interrupted update can simply be run again.
+
+        If `walk` is False, the added (+) and removed (-) lemmas are printed
+        instead of extracted, and no snapshot is saved.
+        '''
+        previous = latest_manifest(self.manifests, self.code)
+        old = load_manifest(previous, self.base_url) if previous else []
+        lemmas = [
+            lemma for page in self.iter_category(self.start_url)
+            for lemma in page
+            ]
+        added, removed = diff_manifests(old, lemmas)
+
+        print('Manifest: %s added, %s removed since %s.' % (
+            len(added), len(removed), previous), file=stderr)
+
+        if not walk:
+            for orth, _ in added:
+                self.print_annotation('+ ' + orth)
+
+            for orth, _ in removed:
+                self.print_annotation('- ' + orth)
+
+            return
+
+        self.timestamp()
+        self.walk_lemmas(added)
+        self.finish_walk()
+
+        fn = save_manifest(lemmas, self.manifests, self.code, self.base_url)
+
+        with open(fn[:-len('.tsv.gz')] + '.removed', 'w+') as f:
+            f.write(''.join(orth + '\n' for orth, _ in removed))
+
+    def defer(self, orth, url, error, attempts=0):
+        '''Queue `orth` to be retried if `error` is a network hiccup.
+
+        Other errors are printed, except for HiccupErrors, which are not
+        worth mentioning, unless they are network hiccups that have used up
+        their retries. BudgetErrors are always printed. This method returns
+        True if `orth` was queued.
+        '''
+        # log lemmas that ran out of time, with the stage they were in
+        if isinstance(error, BudgetError):
+            self.print_error(orth, url, error)
+
+        if self.retries is not None and self.is_transient(error):
+            if self.retries.push(orth, url, attempts):
+                return True
+
+            if not isinstance(error, BudgetError):
+                self.print_error(orth, url, error)
+
+        # some errors aren't worth mentioning
+        elif not isinstance(error, HiccupError):
+            self.print_error(orth, url, error)
+
+        return False
+
+    def retry(self, wait=True):
+        '''Retry the words in `self.retries`, until none are left.
+
+        Words that fail again due to network hiccups are queued again with a
+        longer delay. If `wait` is False, only the words that are already due
+        are retried. This method prints how many words were recovered.
+        '''
+        recovered = lost = 0
+
+        while True:
+            entry = self.retries.pop(wait=wait)
+
+            if not entry:
+                break
+
+            try:
+                self.extract(entry['orth'], entry['url'])
+                recovered += 1
+
+            # the word was fetched, even if it isn't wanted
+            except SilentError:
+                recovered += 1
+
+            except Exception as error:
+                lost += not self.defer(
+                    entry['orth'], entry['url'], error, entry['attempts'] + 1)
+
+        print('Retries: %s words recovered, %s lost, %s still queued.' % (
+            recovered, lost, len(self.retries)), file=stderr)
+
+    def is_transient(self, error):
+        '''Say if `error` is due to a (possibly) transient network problem.'''
+        if isinstance(error, HTTPError):
+            return error.code == 429 or error.code >= 500
+
+        return isinstance(error, (
+            BudgetError,
+            NetworkError,
+            URLError,
+            TimeoutError,
+            ConnectionError,
+            ))
+
+    def iter_category(self, url):
+        '''Yield the lemmas listed on each category page, beginning with `url`.
+
+        Each category page is yielded as a list of (orth, href) tuples.
+        '''
+        while url:
+            soup = BeautifulSoup(self.fetch(url), 'html.parser')
+            page = soup.find_all(
+                'a', title='Category:%s lemmas' % self.lang)[-1]
+            words = soup.find('div', id='mw-pages') \
+                .find_all('div', class_='mw-category-group')
+
+            del soup
+
+            yield [
+                (a.text, self.base_url + a.get('href'))
+                for div in words
+                for a in div.find_all('a', string=Extract.MIN_WORD_P)
+                ]
+
+            if page.text == 'next page':
+                url = self.base_url + page.get('href')
+
+            else:
+                url = None
+
+    def iter_members(self, url):
+        '''Yield the titles of the pages in the category at `url`.
+
+        Unlike `self.iter_category()`, this method follows the category's
+        "next page" links on any Wiktionary, whatever its language.
+        '''
+        while url:
+            soup = BeautifulSoup(self.fetch(url), 'html.parser')
+            pages = soup.find('div', id='mw-pages')
+
+            del soup
+
+            if not pages:
+                return
+
+            for div in pages.find_all('div', class_='mw-category-group'):
+                for a in div.find_all('a'):
+                    yield a.get('title', a.text)
+
+            page = pages.find('a', href=Extract.NEXT_PAGE_P)
+            url = urljoin(url, page.get('href')) if page else None
 
     def extract(self, orth, url):
+        '''Extract and print lexical information about `orth` from `url`.'''
+        # collect every annotation before printing any, so that a lemma that
+        # fails partway (e.g., runs out of time) is not printed in part
+        for annotation in list(self.annotate(orth, url)):
+            if isinstance(annotation, ExtractionError):
+                self.print_error(orth, url, annotation)
+
+            else:
+                self.print_annotation(*annotation)
+
+    def annotate(self, orth, url):
         '''Extract lexical information about `orth` from `url`.
 
         Lexical information includes part of speech, declensions, and
-        compound segmentation(s).
+        compound segmentation(s). This method yields the annotations for
+        `orth` and its declensions as tuples, as well as the ExtractionErrors
+        raised by declensions that could not be split.
+
+        If `self.budget` is set, a BudgetError is raised once `orth` has taken
+        more than `self.budget` seconds.
         '''
+        if self.budget:
+            self.local.deadline = time.monotonic() + self.budget
+
+        try:
+            yield from self._annotate(orth, url)
+
+        finally:
+            self.local.deadline = None
+
+    def _annotate(self, orth, url):
+        '''Extract lexical information about `orth` (see `self.annotate()`).'''
+        self.check_budget('lemma')
         soup = self.get_finnish_soup(url, self.lang)
+
+        # teach the segmenter whether `orth` is a word or an affix
+        if self.segmenter:
+            self.segmenter.learn(orth, self.is_affix(soup))
+
+        self.check_budget('pos')
         pos = self.get_pos(soup)
+        self.check_budget('etymology')
         compounds = self.get_compounds(orth, soup)
+        self.check_budget('declensions')
         declensions = self.get_declensions(soup, orth, pos)
 
         del soup
@@ -149,30 +468,154 @@ class Extract:
         for compound in compounds:
             # use an asterisk to indicate that the word is in its
             # Wiktionary dictionary for,
-            self.print_annotation(orth + '*', pos, compound)
+            yield orth + '*', pos, compound
 
             if '=' not in compound and '+' not in compound:
                 # if `compound` is not a closed compound, then `orth` is
                 # already a properly segmented (open) compound
                 for _orth in declensions:
-                    self.print_annotation(_orth, pos, _orth.lower())
+                    yield _orth, pos, _orth.lower()
 
             else:
                 for _orth in declensions:
 
                     try:
                         _compound = self.split_declension(_orth, compound)
-                        self.print_annotation(_orth, pos, _compound)
+                        yield _orth, pos, _compound
+
+                    except BudgetError:
+                        raise
 
                     except ExtractionError as error:
-                        self.print_error(orth, url, error)
+                        yield error
                         continue
 
         if not compounds:
-            self.print_annotation(orth + '*', pos)
+            yield orth + '*', pos
 
             for declension in declensions:
-                self.print_annotation(declension, pos)
+                yield declension, pos
+
+    def iter_annotations(self, lemmas, workers=1, window=None):
+        '''Yield the annotations for the (orth, href) tuples in `lemmas`.
+
+        This method is the in-process counterpart to `self.walk()`: rather
+        than printing annotations and errors, it yields them as Annotation and
+        Failure records, in the order of `lemmas`. SilentErrors are skipped,
+        as they are in `self.walk()`.
+
+        The lemmas are extracted by `workers` threads. At most `window`
+        lemmas (by default, twice `workers`) are in flight at a time, so that
+        a slow consumer holds back extraction rather than letting results
+        pile up in memory. `lemmas` is consumed lazily, e.g.:
+
+            >>> lemmas = (l for p in E.iter_category(E.start_url) for l in p)
+            >>> for record in E.iter_annotations(lemmas, workers=8):
+            ...     print(record)
+        '''
+        if workers <= 1:
+            for orth, href in lemmas:
+                yield from self.annotate_records(orth, href)
+
+            return
+
+        window = window or workers * 2
+        pending = deque()
+        lemmas = iter(lemmas)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for orth, href in lemmas:
+                    pending.append(executor.submit(
+                        self.annotate_records, orth, href))
+
+                    if len(pending) >= window:
+                        yield from pending.popleft().result()
+
+                while pending:
+                    yield from pending.popleft().result()
+
+            # if the consumer stops early, don't extract what's in flight
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def annotate_records(self, orth, url):
+        '''Return the annotations for `orth` as a list of records.'''
+        records = []
+
+        try:
+            for annotation in self.annotate(orth, url):
+                if isinstance(annotation, ExtractionError):
+                    records.append(Failure(orth, url, annotation))
+
+                else:
+                    records.append(Annotation.from_tuple(annotation))
+
+        except SilentError:
+            pass
+
+        except Exception as error:
+            records.append(Failure(orth, url, error))
+
+        return records
+
+    def fetch(self, url):
+        '''Return the HTML at `url`, via `self.cache` and `self.pages`.
+
+        The connect and read timeouts are cut short to fit what remains of the
+        current lemma's budget.
+        '''
+        remaining = self.check_budget()
+        timeout, read_timeout = self.timeout, self.read_timeout
+
+        if remaining is not None:
+            timeout = min(timeout or remaining, remaining)
+            read_timeout = min(read_timeout or remaining, remaining)
+
+        def read(url):
+            return read_url(url, timeout, read_timeout)
+
+        if self.cache is None:
+            return self.pages.fetch(url, read) if self.pages else read(url)
+
+        # fragments never reach the server, so ignore them when caching
+        key = urldefrag(url)[0]
+        fetched = getattr(self.local, 'fetched', None)
+
+        if fetched is not None:
+            fetched.append(key)
+
+        html = self.cache.get(key)
+
+        if html is None:
+            html = self.pages.fetch(url, read) if self.pages else read(url)
+            self.cache.put(key, html)
+
+        return html
+
+    def check_budget(self, stage=None):
+        '''Raise a BudgetError if the current lemma has run out of time.
+
+        `stage` names what the lemma is about to do, for the error message.
+        This method returns the seconds remaining (or None, if there is no
+        budget).
+        '''
+        if stage:
+            self.local.stage = stage
+
+        deadline = getattr(self.local, 'deadline', None)
+
+        if deadline is None:
+            return None
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            raise BudgetError('Over budget (%ss) at stage: %s.' % (
+                self.budget, getattr(self.local, 'stage', None)))
+
+        return remaining
 
     def get_finnish_soup(self, url, lang):
         '''Return parsed HTML about the target language `lang` from `url.`
@@ -181,7 +624,7 @@ class Extract:
         word/string across different languages, this method returns the
         BeautifulSoup-parsed HTML section that pertains to the target language.
         '''
-        soup = BeautifulSoup(urlopen(url), 'html.parser')
+        soup = BeautifulSoup(self.fetch(url), 'html.parser')
         section = soup.find('span', class_='mw-headline', id=lang)
         finnish = ''
 
@@ -198,36 +641,110 @@ class Extract:
         except AttributeError:
             raise HiccupError('No soup.')
 
-    def find_likely_pos(self, url=None):
-        '''Scrape likely part-of-speech categories for the target language.'''
+    def find_likely_pos(self, url=None, sample=None, confidence=0.95,
+                        workers=8, min_sample=100):
+        '''Scrape likely part-of-speech categories for the target language.
+
+        This method prints each headline found in the target language's
+        lemmas alongside the number of lemmas it heads, most frequent first.
+
+        If `sample` is given, only a stratified random sample of (at most)
+        `sample` lemmas is fetched, drawn from every category page in
+        proportion to its size. The sample is fetched in batches by `workers`
+        threads and sampling stops early once the estimated probability of
+        the next lemma revealing an unseen headline falls below
+        1 - `confidence`. This estimate is the Good-Turing estimate: the
+        number of headlines seen in only one lemma, over the number of lemmas
+        fetched. Since the estimate is unreliable over few lemmas, sampling
+        only stops once at least `min_sample` lemmas have been fetched and
+        the estimate has stayed below the threshold for two batches running.
+        '''
+        counts = Counter()
+        fetched = 0
+
         try:
-            if not url:
-                self.headers = set()
-                url = self.start_url
+            pages = list(self.iter_category(url or self.start_url))
 
-            soup = BeautifulSoup(urlopen(url), 'html.parser')
-            page = soup.find_all(
-                'a', title='Category:%s lemmas' % self.lang)[-1]
-            words = soup.find('div', id='mw-pages').find_all(
-                'div', class_='mw-category-group')
+            if sample:
+                lemmas = self.sample_lemmas(pages, sample)
 
-            del soup
+            else:
+                lemmas = [lemma for page in pages for lemma in page]
 
-            for div in words:
-                for a in div.find_all('a', string=Extract.MIN_WORD_P):
-                    href = WIKI_EN_URL + a.get('href')
-                    soup = self.get_finnish_soup(href, self.lang)
-                    headers = soup.find_all(
-                        'span', class_='mw-headline', string=self.NON_POS_P)
-                    self.headers.update(h.text for h in headers)
+            del pages
 
-            if page.text == 'next page':
-                return self.find_likely_pos(WIKI_EN_URL + page.get('href'))
+            batch = workers * 4
+            below = 0
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for i in range(0, len(lemmas), batch):
+                    for headers in executor.map(
+                            self.get_headers, lemmas[i:i + batch]):
+                        counts.update(headers)
+                        fetched += 1
+
+                    if not sample:
+                        continue
+
+                    singletons = sum(1 for n in counts.values() if n == 1)
+
+                    if singletons <= fetched * (1 - confidence):
+                        below += 1
+
+                    else:
+                        below = 0
+
+                    if below >= 2 and fetched >= min_sample:
+                        break
 
         except KeyboardInterrupt:
-            print(url)
+            pass
+
+        print('# %s lemmas fetched' % fetched, file=stderr)
+
+        for header, n in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
+            print('%s\t%s' % (header, n))
+
+    def sample_lemmas(self, pages, sample):
+        '''Draw a stratified random sample of `sample` lemmas from `pages`.
+
+        Each category page in `pages` is a stratum, contributing lemmas in
+        proportion to its size. The sample is returned in random order, so
+        that any prefix of the sample spans the whole category.
+        '''
+        total = sum(len(page) for page in pages) or 1
+        lemmas = []
 
-        print('\n'.join(sorted(list(self.headers))))
+        for page in pages:
+            k = min(len(page), max(1, round(sample * len(page) / total)))
+            lemmas.extend(random.sample(page, k))
+
+        random.shuffle(lemmas)
+
+        return lemmas[:sample]
+
+    def get_headers(self, lemma):
+        '''Return the set of non-POS-excluded headlines for `lemma`.
+
+        `lemma` is an (orth, href) tuple. An empty set is returned if the
+        lemma's page could not be fetched.
+        '''
+        try:
+            soup = self.get_finnish_soup(lemma[1], self.lang)
+
+        except (
+                ExtractionError,
+                HTTPError,
+                URLError,
+                TimeoutError,
+                ConnectionError,
+                ):
+            return set()
+
+        headers = soup.find_all(
+            'span', class_='mw-headline', string=self.NON_POS_P)
+
+        return set(h.text for h in headers)
 
     def debug(self, debug_li):
         '''Print the annotations for the words listed in `debug_li`.
@@ -237,23 +754,235 @@ class Extract:
         `debug_li`. If `debug_li` is a string, it will treat the string as a
         filename and attempt to read a list of words from the file.
         '''
+        for orth, href in self.read_debug_li(debug_li):
+            try:
+                self.extract(orth, href)
+
+            except ExtractionError as error:
+                self.print_error(orth, href, error)
+
+            self.print_annotation('')
+
+    def regress(self, debug_li, golden_fn, record=False, workers=8):
+        '''Compare the annotations for `debug_li` against those in `golden_fn`.
+
+        This method re-extracts the words listed in `debug_li` (see
+        `self.debug()`) using `workers` threads and prints, for each word whose
+        annotations differ from those recorded in the json file `golden_fn`,
+        the forms whose annotations were changed (~), added (+), or removed
+        (-). Pair this method with a replaying PageCache to validate grammar or
+        regex changes without hitting Wiktionary.
+
+        If `record` is True, the new annotations are written to `golden_fn`
+        instead.
+
+        Since `self.segmenter` learns from words in the order they are
+        extracted, regressions with a segmenter are only reproducible with a
+        single worker.
+        '''
+        start = time.perf_counter()
+        debug_li = self.read_debug_li(debug_li)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(
+                (orth for orth, _ in debug_li),
+                executor.map(lambda w: self.golden_annotate(*w), debug_li)))
+
+        if record:
+            with open(golden_fn, 'w+') as f:
+                json.dump(
+                    results, f, indent=4, sort_keys=True, ensure_ascii=False)
+
+            print('# %s words recorded (%.2fs)' % (
+                len(results), time.perf_counter() - start))
+
+            return
+
+        try:
+            with open(golden_fn, 'r+') as f:
+                golden = json.load(f)
+
+        except FileNotFoundError:
+            golden = {}
+
+        differ = 0
+
+        for orth, annotations in results.items():
+            diff = self.diff_annotations(golden.get(orth, []), annotations)
+
+            if diff:
+                differ += 1
+                print(orth)
+                print('\n'.join('  ' + line for line in diff))
+
+        print('# %s of %s words differ (%.2fs)' % (
+            differ, len(results), time.perf_counter() - start))
+
+        if self.segmenter:
+            print('# ' + self.segmenter.report())
+
+    def golden_annotate(self, orth, url):
+        '''Return the annotations for `orth` as a list of strings.
+
+        Each annotation is formatted as in `self.print_annotation()`. An error
+        is formatted as '! : <error type> : <error message>'.
+        '''
+        annotations = []
+
+        try:
+            for annotation in self.annotate(orth, url):
+                if isinstance(annotation, ExtractionError):
+                    annotations.append('! : %s : %s' % (
+                        type(annotation).__name__, str(annotation)))
+
+                else:
+                    annotations.append(' : '.join(annotation))
+
+        except Exception as error:
+            annotations.append(
+                '! : %s : %s' % (type(error).__name__, str(error)))
+
+        return sorted(annotations)
+
+    def diff_annotations(self, old, new):
+        '''Return the changed, added, and removed annotations in `new`.
+
+        Annotations are compared by form (i.e., the word or declension they
+        annotate), so that a new segmentation of an existing form is reported
+        as a single change rather than as an addition and a removal.
+        '''
+        def by_form(annotations):
+            forms = {}
+
+            for annotation in annotations:
+                form, _, rest = annotation.partition(' : ')
+                forms.setdefault(form, set()).add(rest)
+
+            return forms
+
+        old, new = by_form(old), by_form(new)
+        diff = []
+
+        for form in sorted(set(old) | set(new)):
+            before = ' | '.join(sorted(old.get(form, [])))
+            after = ' | '.join(sorted(new.get(form, [])))
+
+            if form not in new:
+                diff.append('- %s : %s' % (form, before))
+
+            elif form not in old:
+                diff.append('+ %s : %s' % (form, after))
+
+            elif before != after:
+                diff.append('~ %s : %s -> %s' % (form, before, after))
+
+        return diff
+
+    def read_debug_li(self, debug_li):
+        '''Return the words listed in `debug_li` as (orth, href) tuples.
+
+        If `debug_li` is a string, it is treated as the name of a file listing
+        one word per line.
+        '''
         if isinstance(debug_li, str):
             with open(debug_li, 'rb') as f:
                 debug_li = Extract.DEBUG_WORD_P.findall(
                     f.read().decode('utf-8'))
 
+        words = []
+
         for orth in debug_li:
             if orth:
                 orth = orth.replace('\n', '')
-                href = WIKI_EN_URL + '/wiki/' + quote(orth.replace(' ', '_'))
+                href = self.base_url + '/wiki/' + quote(orth.replace(' ', '_'))
+                words.append((orth, href))
+
+        return words
+
+    # affixes -----------------------------------------------------------------
+
+    def preload_affixes(self, fn=None, refresh=False):
+        '''Collect the members of the categories in `self.affix_categories`.
+
+        `self.affix_categories` maps 'en' and 'native' to lists of category
+        titles on the English Wiktionary and the target language's Wiktionary,
+        respectively (e.g., 'Category:Finnish suffixes'). Their members are
+        stored in `self.known_affixes`, under the same keys, which
+        `self.format_morpheme()` consults before fetching a morpheme's page.
+        The two are kept apart, since the same string can be an affix on one
+        Wiktionary and a word on the other.
+
+        The affixes are saved to the json file `fn` (by default,
+        'lang/<code>.affixes.json') and loaded from it on later runs, unless
+        `refresh` is True or the categories have since changed. If any of
+        the categories could not be fetched, the affixes are not saved, so
+        that later runs try again.
+        '''
+        if not fn:
+            fn = 'lang/%s.affixes.json' % self.code
+
+        categories = getattr(self, 'affix_categories', {})
+
+        if not refresh:
+            try:
+                with open(fn, 'r+') as f:
+                    saved = json.load(f)
+
+                if saved['categories'] == categories:
+                    self.known_affixes = {
+                        wiki: set(affixes)
+                        for wiki, affixes in saved['affixes'].items()
+                        }
+                    return self.known_affixes
+
+            except (FileNotFoundError, ValueError, KeyError, AttributeError):
+                pass
+
+        urls = [
+            ('en', self.base_url + '/wiki/' + quote(title.replace(' ', '_')))
+            for title in categories.get('en', [])
+            ]
+
+        if self.wiki:
+            urls.extend(
+                ('native', self.wiki + quote(title.replace(' ', '_')))
+                for title in categories.get('native', []))
+
+        affixes = {'en': set(), 'native': set()}
+        complete = True
+
+        with ThreadPoolExecutor(max_workers=max(1, len(urls))) as executor:
+            for (wiki, url), members in zip(
+                    urls, executor.map(self._members, [u for _, u in urls])):
+                if members is None:
+                    complete = False
+                    self.print_error('', url, HiccupError(
+                        'Could not preload affix category.'))
+
+                else:
+                    affixes[wiki].update(members)
 
-                try:
-                    self.extract(orth, href)
+        if complete:
+            with open(fn, 'w+') as f:
+                json.dump({
+                    'categories': categories,
+                    'affixes': {
+                        wiki: sorted(members)
+                        for wiki, members in affixes.items()
+                        },
+                    }, f, indent=4)
 
-                except ExtractionError as error:
-                    self.print_error(orth, href, error)
+        self.known_affixes = affixes
 
-                self.print_annotation('')
+        return self.known_affixes
+
+    def _members(self, url):
+        '''Return the titles in the category at `url`, or None on failure.'''
+        try:
+            return list(self.iter_members(url))
+
+        except (HTTPError, URLError, TimeoutError, ConnectionError):
+            return None
 
     # part of speech ----------------------------------------------------------
 
@@ -323,7 +1052,7 @@ class Extract:
                         lang = self.native_lang
 
                     else:
-                        url = WIKI_EN_URL + a_tag.get('href')
+                        url = self.base_url + a_tag.get('href')
                         lang = self.lang
 
                     split[i] = (comp, url, lang)
@@ -344,6 +1073,9 @@ class Extract:
             except SilentError:
                 continue
 
+            except BudgetError:
+                raise
+
             except ExtractionError as err:
                 error = error or err  # keep first error
 
@@ -374,6 +1106,8 @@ class Extract:
         error = None
 
         for i, (morph, url, lang) in enumerate(split):
+            self.check_budget('constituents')
+
             try:
                 morph, is_affix = self.format_morpheme(morph, url, lang)
                 affixes += is_affix
@@ -385,10 +1119,24 @@ class Extract:
                         "Affix not otherwise specified: '%s'." % morph)
                     morph = '-' + morph + '-'
 
-            # thrown in `get_finnish_soup()` when `url` is invalid
-            except (HTTPError, URLError):
-                error = HiccupError(
-                    "Could not verify '%s' due to invalid URL." % morph)
+            # thrown in `get_finnish_soup()` when `url` is invalid...
+            except HTTPError as err:
+                if self.is_transient(err):
+                    error = NetworkError(
+                        "Could not verify '%s' due to HTTP error %s." % (
+                            morph, err.code))
+
+                else:
+                    error = HiccupError(
+                        "Could not verify '%s' due to invalid URL." % morph)
+
+            # or when the host is unresponsive
+            except (URLError, TimeoutError, ConnectionError):
+                error = NetworkError(
+                    "Could not verify '%s' due to network error." % morph)
+
+            except BudgetError:
+                raise
 
             # raised when no "Finnish" soup is found in `get_finnish_soup()`
             except ExtractionError as err:
@@ -412,6 +1160,7 @@ class Extract:
         goal = self.basify(orth)
 
         if self.basify(compound) != goal:
+            self.check_budget('reconcile')
             compound = self.reconcile_lemma(goal, compound)
 
         if ' ' in orth or '-' in orth:
@@ -507,12 +1256,24 @@ class Extract:
         morpheme and the second element is a boolean indicating if the morpheme
         is affixal.
         '''
-        soup = self.get_finnish_soup(url, lang)
+        # `morph` links to the target language's Wiktionary if `lang` is the
+        # target language's own name for itself
+        wiki = 'native' if lang == self.native_lang else 'en'
+        is_affix = True if morph in self.known_affixes[wiki] else None
 
-        # determine if `morph` is an affix...
-        for label in soup.find_all('span', class_='mw-headline'):
-            if label.text in self.affixes:
-                return morph, True
+        # determine if `morph` is an affix, without fetching `url` if the
+        # segmenter already knows...
+        if self.segmenter and is_affix is None:
+            is_affix = self.segmenter.classify(morph)
+
+        if is_affix is None:
+            is_affix = self.is_affix(self.get_finnish_soup(url, lang))
+
+            if self.segmenter:
+                self.segmenter.learn(morph, is_affix)
+
+        if is_affix:
+            return morph, True
 
         # otherwise, if `morph` is a word, temporarily represent all word
         # boundaries as '='
@@ -526,6 +1287,14 @@ class Extract:
 
         return morph, False
 
+    def is_affix(self, soup):
+        '''Say if `soup` has any of the headlines in `self.affixes`.'''
+        for label in soup.find_all('span', class_='mw-headline'):
+            if label.text in self.affixes:
+                return True
+
+        return False
+
     def format_compound(self, compound):
         '''Format the delimiters in `compound`.'''
         if compound.startswith('='):
@@ -598,6 +1367,7 @@ class Extract:
 
     def split_declension(self, declension, compound):
         '''Split and format `declension` given its lemma `compound`.'''
+        self.check_budget('reconcile')
         goal = self.basify(declension)
         compound = self.reconcile_declension(goal, compound)
 
@@ -644,3 +1414,11 @@ class HiccupError(ExtractionError):
 
 class SilentError(ExtractionError):
     pass
+
+
+class BudgetError(HiccupError):
+    pass
+
+
+class NetworkError(HiccupError):
+    pass
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import os
+
+from datetime import datetime
+
+
+def save_manifest(lemmas, path, code, base_url=''):
+    '''Save a snapshot of the (orth, href) tuples in `lemmas` to `path`.
+
+    The snapshot is a gzipped, sorted, tab-separated list of lemmas and their
+    hrefs (sans `base_url`), named '<code>-<timestamp>.tsv.gz'. This function
+    returns the snapshot's filename.
+    '''
+    os.makedirs(path, exist_ok=True)
+    fn = os.path.join(path, '%s-%s.tsv.gz' % (
+        code, datetime.utcnow().strftime('%Y%m%dT%H%M%S')))
+    lines = sorted(set(
+        '%s\t%s\n' % (orth, href[len(base_url):]
+                      if href.startswith(base_url) else href)
+        for orth, href in lemmas))
+
+    with gzip.open(fn, 'wt', encoding='utf-8') as f:
+        f.write(''.join(lines))
+
+    return fn
+
+
+def load_manifest(fn, base_url=''):
+    '''Return the (orth, href) tuples in the snapshot `fn`.'''
+    with gzip.open(fn, 'rt', encoding='utf-8') as f:
+        return [
+            (orth, href if '://' in href else base_url + href)
+            for orth, href in (line.rstrip('\n').split('\t') for line in f)
+            ]
+
+
+def latest_manifest(path, code):
+    '''Return the filename of the latest snapshot for `code`, or None.'''
+    try:
+        snapshots = sorted(
+            fn for fn in os.listdir(path)
+            if fn.startswith(code + '-') and fn.endswith('.tsv.gz'))
+
+    except FileNotFoundError:
+        return None
+
+    return os.path.join(path, snapshots[-1]) if snapshots else None
+
+
+def diff_manifests(old, new):
+    '''Return the lemmas added to and removed from `old` in `new`.
+
+    Both `old` and `new` are lists of (orth, href) tuples; so are the added
+    and removed lemmas, which are returned in sorted order.
+    '''
+    old, new = set(old), set(new)
+
+    return sorted(new - old), sorted(old - new)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import socket
+import threading
+import time
+
+from urllib.error import HTTPError, URLError
+from urllib.parse import urldefrag
+from urllib.request import urlopen
+
+
+# the number of bytes to read at a time
+CHUNK = 64 * 1024
+
+
+def read_url(url, timeout=None, read_timeout=None):
+    '''Return the body of the page at `url`.
+
+    `timeout` bounds the seconds spent connecting to the host, as well as
+    the seconds spent waiting on any single read. `read_timeout` bounds the
+    seconds spent reading the whole body, so that huge or trickling pages
+    cannot stall a caller indefinitely. Either raises a TimeoutError.
+    '''
+    response = urlopen(url, timeout=timeout)
+    deadline = time.monotonic() + read_timeout if read_timeout else None
+    sock = get_socket(response)
+    chunks = []
+
+    with response:
+        while True:
+            # never wait on a read past the deadline
+            if deadline and sock:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    raise TimeoutError('Timed out reading %s.' % url)
+
+                sock.settimeout(
+                    min(timeout, remaining) if timeout else remaining)
+
+            try:
+                # unlike `read()`, `read1()` returns whatever has arrived
+                # rather than waiting on a full chunk
+                chunk = response.read1(CHUNK)
+
+            except socket.timeout:
+                raise TimeoutError('Timed out reading %s.' % url)
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+
+            if deadline and time.monotonic() > deadline:
+                raise TimeoutError('Timed out reading %s.' % url)
+
+    return b''.join(chunks)
+
+
+def get_socket(response):
+    '''Return the socket underlying the HTTP `response`, or None.'''
+    return getattr(getattr(response.fp, 'raw', None), '_sock', None)
+
+
+def is_permanent(error):
+    '''Return True if the HTTPError `error` will not go away on a retry.'''
+    return 400 <= error.code < 500 and error.code != 429
+
+
+def read_error(fn):
+    '''Return the HTTP status code and reason recorded in the file `fn`.'''
+    with open(fn, 'r') as f:
+        code, _, reason = f.read().partition(' ')
+
+    return int(code), reason or 'Recorded error.'
+
+
+class PageCache:
+    '''A directory of recorded Wiktionary pages, keyed by url.
+
+    Each page is recorded to a file named after the SHA-1 hash of its url
+    (sans fragment). Pages that could not be found are recorded too (as
+    '<hash>.err' files containing the HTTP status code and reason), so that
+    replaying a recording raises the same HTTPErrors as the original run.
+    Only permanent errors (4xx codes other than 429) are recorded, and
+    outside of replays, pages recorded as errors are fetched anew.
+
+    If `replay` is True, pages that were never recorded raise a URLError
+    instead of being fetched.
+    '''
+
+    def __init__(self, path, replay=False):
+        self.path = path
+        self.replay = replay
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def fetch(self, url, read=read_url):
+        '''Return the HTML at `url`, recording it if it is not yet recorded.
+
+        Pages that are not yet recorded are fetched by calling `read(url)`.
+        '''
+        fn = self.filename(url)
+
+        try:
+            with open(fn, 'rb') as f:
+                return f.read()
+
+        except FileNotFoundError:
+            pass
+
+        if self.replay:
+            try:
+                code, reason = read_error(fn + '.err')
+
+                raise HTTPError(url, code, reason, None, None)
+
+            except FileNotFoundError:
+                pass
+
+            raise URLError('Not recorded: %s' % url)
+
+        try:
+            html = read(url)
+
+        except HTTPError as error:
+            # only record permanent errors, lest a passing 429 or 503 stick
+            if is_permanent(error):
+                with open(fn + '.err', 'w') as f:
+                    f.write('%s %s' % (error.code, error.reason))
+
+            raise
+
+        # write to a temporary file first, so that concurrent readers never
+        # see a partially recorded page
+        tmp = '%s.tmp%s.%s' % (fn, os.getpid(), threading.get_ident())
+
+        with open(tmp, 'wb') as f:
+            f.write(html)
+
+        os.replace(tmp, fn)
+
+        # forget any error recorded for the page before it came back
+        try:
+            os.remove(fn + '.err')
+
+        except FileNotFoundError:
+            pass
+
+        return html
+
+    def filename(self, url):
+        '''Return the name of the file that `url` is recorded to.'''
+        # fragments never reach the server, so ignore them when recording
+        url = urldefrag(url)[0]
+
+        return os.path.join(
+            self.path, hashlib.sha1(url.encode('utf-8')).hexdigest())
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+
+class Annotation(namedtuple(
+        'Annotation', ['orth', 'pos', 'segmentation', 'lemma'])):
+    '''An annotation of a lemma or declension, as yielded by `Extract`.
+
+    `segmentation` is None if the word is not a compound, and `lemma` says if
+    `orth` is the dictionary form of the word.
+    '''
+
+    __slots__ = ()
+
+    @classmethod
+    def from_tuple(cls, annotation):
+        '''Create an Annotation from a tuple from `Extract.annotate()`.'''
+        orth, pos = annotation[:2]
+        segmentation = annotation[2] if len(annotation) > 2 else None
+        lemma = orth.endswith('*')
+
+        return cls(orth[:-1] if lemma else orth, pos, segmentation, lemma)
+
+    def fields(self):
+        '''Return the annotation as printed by `Extract.print_annotation()`.'''
+        return [self.orth + ('*' if self.lemma else ''), self.pos] + \
+            ([self.segmentation] if self.segmentation is not None else [])
+
+    def __str__(self):
+        return ' : '.join(self.fields())
+
+
+class Failure(namedtuple('Failure', ['orth', 'url', 'error'])):
+    '''An error raised while extracting `orth` from `url`.'''
+
+    __slots__ = ()
+
+    def __str__(self):
+        return '%s (%s) %s: %s' % (
+            self.orth, self.url, type(self.error).__name__, str(self.error))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class RetryQueue:
+    '''A persistent queue of words to retry with exponential backoff.
+
+    Each entry is a dict with the word's orthography ('orth'), its url
+    ('url'), the number of times it has already been retried ('attempts'),
+    and the time at which it is next due ('due'). The queue is written to the
+    json file `fn` whenever it changes, so that a later run can pick up where
+    an interrupted one left off. If `fn` is None, the queue is only kept in
+    memory.
+
+    A word that fails for the nth time is next due `delay` * 2 ** n seconds
+    later. Words are given up on after `max_attempts` retries.
+    '''
+
+    def __init__(self, fn, delay=30, max_attempts=5):
+        self.fn = fn
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+
+        # for breaking ties between entries that are due at the same time
+        self.count = itertools.count()
+
+        # a heap of (due, tiebreaker, entry) tuples
+        self.heap = []
+
+        if not self.fn:
+            return
+
+        try:
+            with open(self.fn, 'r+') as f:
+                self.heap = [
+                    (e['due'], next(self.count), e) for e in json.load(f)]
+
+            heapq.heapify(self.heap)
+
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, orth, url, attempts=0):
+        '''Queue `orth` to be retried, unless it has been retried too often.
+
+        This method returns False if `orth` is given up on.
+        '''
+        if attempts >= self.max_attempts:
+            return False
+
+        entry = {
+            'orth': orth,
+            'url': url,
+            'attempts': attempts,
+            'due': time.time() + self.delay * 2 ** attempts,
+            }
+
+        with self.lock:
+            heapq.heappush(self.heap, (entry['due'], next(self.count), entry))
+            self.save()
+
+        return True
+
+    def pop(self, wait=True):
+        '''Remove and return the next entry that is due.
+
+        If `wait` is True, this method sleeps until the next entry is due;
+        otherwise, it returns None if no entry is due yet.
+        '''
+        with self.lock:
+            if not self.heap:
+                return None
+
+            due = self.heap[0][0]
+
+        if due > time.time():
+            if not wait:
+                return None
+
+            time.sleep(max(0, due - time.time()))
+
+        with self.lock:
+            entry = heapq.heappop(self.heap)[2]
+            self.save()
+
+        return entry
+
+    def save(self):
+        '''Write the queue to `self.fn`, if it is set.'''
+        if not self.fn:
+            return
+
+        tmp = self.fn + '.tmp'
+
+        with open(tmp, 'w+') as f:
+            json.dump(
+                [e for _, _, e in sorted(self.heap)],
+                f, indent=4, ensure_ascii=False)
+
+        os.replace(tmp, self.fn)
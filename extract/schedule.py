@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    '''A thread-safe cache of at most `size` items, evicting the least recent.
+
+    The cache counts its hits and lookups, to report its hit rate.
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        '''Return the item cached under `key`, or None.'''
+        with self.lock:
+            self.lookups += 1
+
+            try:
+                self.items.move_to_end(key)
+                self.hits += 1
+
+                return self.items[key]
+
+            except KeyError:
+                return None
+
+    def put(self, key, item):
+        '''Cache `item` under `key`, evicting the least recent item if full.'''
+        with self.lock:
+            self.items[key] = item
+            self.items.move_to_end(key)
+
+            if len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def touch(self, key):
+        '''Look up `key` and cache it if missing, as if it were fetched.'''
+        if self.get(key) is None:
+            self.put(key, True)
+
+    def copy(self):
+        '''Return a copy of the cache, without its hit and lookup counts.'''
+        cache = LRUCache(self.size)
+
+        with self.lock:
+            cache.items = self.items.copy()
+
+        return cache
+
+    def hit_rate(self):
+        return 100.0 * self.hits / self.lookups if self.lookups else 0.0
+
+
+class Scheduler:
+    '''Reorder lemmas so that the pages they share stay cached.
+
+    Lemmas are scheduled `window` at a time. Compounds sharing their first
+    constituent (and that constituent itself) are already adjacent in
+    alphabetical order, so the scheduler keeps each such block of lemmas
+    together and only reorders the blocks: after each block, it goes on to a
+    block sharing one of its heads (i.e., the last constituents of its
+    compounds), so that the head's page is still cached when it is needed
+    again, or else to the next block in alphabetical order.
+
+    Chasing heads that recur often enough to stay cached in any order only
+    breaks up the alphabetical runs, and how often that is depends on the
+    cache size, the number of pages each lemma fetches, and the lexicon. So
+    rather than guess, the scheduler tries ignoring heads found in more than
+    each of `THRESHOLDS` blocks, replays the pages that each candidate order
+    is expected to fetch through a simulated cache of `cache_size` pages,
+    and keeps the order with the most hits, favoring alphabetical order in a
+    tie.
+
+    Whether a lemma looks like a compound is guessed from the lemmas listed
+    so far: a lemma whose ending (of at least `min_length` characters) is
+    itself a listed lemma is assumed to be a compound headed by that lemma,
+    and is expected to fetch its own page and the pages of its constituents.
+
+    To report how much the schedule helps, the scheduler replays the pages
+    actually fetched for each lemma through two more simulated caches: one
+    in scheduled order and one in the original (alphabetical) order.
+    '''
+
+    # the numbers of blocks beyond which a head is not chased
+    THRESHOLDS = (2, 4, 8, 16, 32, None)
+
+    def __init__(self, window=1000, cache_size=1000, min_length=3):
+        self.window = window
+        self.min_length = min_length
+
+        # the lowercased lemmas listed so far, mapped to their urls
+        self.known = {}
+
+        # a simulated cache, replaying the fetches expected in scheduled
+        # order, to choose between orders
+        self.expected = LRUCache(cache_size)
+
+        # simulated caches, replaying the fetches in scheduled and in
+        # alphabetical order
+        self.scheduled = LRUCache(cache_size)
+        self.baseline = LRUCache(cache_size)
+
+    def order(self, lemmas):
+        '''Return the (orth, href) tuples in `lemmas` in scheduled order.'''
+        self.known.update((orth.lower(), href) for orth, href in lemmas)
+
+        # split the window into blocks of lemmas sharing their first
+        # constituent, noting the heads in each block and the pages each
+        # lemma is expected to fetch
+        blocks = []
+        heads = []
+        expected = {}
+        key = None
+
+        for lemma in lemmas:
+            word = lemma[0].lower()
+            head = self.head(word)
+            first = word[:-len(head)] if head else word
+
+            if first != key:
+                blocks.append([])
+                heads.append([])
+                key = first
+
+            blocks[-1].append(lemma)
+            expected[lemma] = [lemma[1]]
+
+            if head:
+                heads[-1].append(head)
+                expected[lemma].extend(
+                    self.known[w] for w in (first, head) if w in self.known)
+
+        # map each head to the blocks that contain it, whether as the head of
+        # a compound or as the first constituent of the block
+        index = {}
+
+        for i, block in enumerate(blocks):
+            for head in [block[0][0].lower()] + heads[i]:
+                index.setdefault(head, []).append(i)
+
+        best = lemmas
+        most = self.count_hits(lemmas, expected)
+
+        for threshold in self.THRESHOLDS:
+            scheduled = self.chain(blocks, heads, index, threshold)
+            hits = self.count_hits(scheduled, expected)
+
+            if hits > most:
+                best, most = scheduled, hits
+
+        for lemma in best:
+            self.replay(expected[lemma], self.expected)
+
+        return best
+
+    def chain(self, blocks, heads, index, threshold=None):
+        '''Order `blocks` by chaining the blocks that share heads.
+
+        `heads` lists the heads in each block, and `index` maps each head to
+        the blocks it is found in. Heads found in more than `threshold`
+        blocks are not chased. This method returns the blocks' lemmas, in
+        order.
+        '''
+        scheduled = []
+        done = [False] * len(blocks)
+        i = 0
+        current = None
+
+        while True:
+            chained = None
+
+            # follow a head of the current block to a block that shares it...
+            if current is not None:
+                for head in reversed(heads[current]):
+                    if threshold and len(index[head]) > threshold:
+                        continue
+
+                    chained = next(
+                        (j for j in index[head] if not done[j]), None)
+
+                    if chained is not None:
+                        break
+
+            # or else, go on to the next block in alphabetical order
+            if chained is None:
+                while i < len(blocks) and done[i]:
+                    i += 1
+
+                if i == len(blocks):
+                    break
+
+                chained = i
+
+            done[chained] = True
+            scheduled.extend(blocks[chained])
+            current = chained
+
+        return scheduled
+
+    def count_hits(self, lemmas, expected):
+        '''Count the hits expected if `lemmas` were extracted in order.
+
+        `expected` maps each lemma to the urls it is expected to fetch.
+        '''
+        cache = self.expected.copy()
+
+        for lemma in lemmas:
+            self.replay(expected[lemma], cache)
+
+        return cache.hits
+
+    def head(self, orth):
+        '''Return the longest listed lemma that `orth` ends in, or None.'''
+        word = orth.lower()
+
+        for i in range(self.min_length, len(word) - self.min_length + 1):
+            if word[i:] in self.known:
+                return word[i:]
+
+        return None
+
+    def replay(self, fetched, cache):
+        '''Replay the urls in `fetched` through the simulated `cache`.'''
+        for url in fetched:
+            cache.touch(url)
+
+    def report(self):
+        '''Compare the hit rates in scheduled and alphabetical order.'''
+        return 'Cache: %.1f%% hit rate over %s fetches (%.1f%% in ' \
+            'alphabetical order).' % (
+                self.scheduled.hit_rate(),
+                self.scheduled.lookups,
+                self.baseline.hit_rate())
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import re
+import threading
+
+
+class Segmenter:
+    '''An incrementally built lexicon of known stems and affixes.
+
+    As `Extract` fetches pages, it teaches the segmenter whether each lemma
+    and constituent is a word or an affix (`self.learn()`). Once the
+    segmenter is confident about a morpheme, `Extract.format_morpheme()` can
+    classify that morpheme without fetching its page (`self.classify()`).
+
+    The segmenter is confident about a morpheme once it has been observed at
+    least `min_count` times, always with the same classification. A morpheme
+    that has never been observed is still classified as a word if it can be
+    segmented into two or more known stems (`self.segment()`), since a
+    compound of words is itself a word.
+    '''
+
+    # for stripping delimiters (cf. `Extract.DELIMITERS_P`)
+    DELIMITERS_P = re.compile(r'[=+\- ]+')
+
+    def __init__(self, min_count=1, min_length=3):
+        # map each morpheme to its observed [word count, affix count]
+        self.counts = {}
+
+        # the basified forms of the stems confidently known to be words
+        self.stems = set()
+
+        # the length of the longest stem in `self.stems`
+        self.longest = 0
+
+        self.min_count = min_count
+        self.min_length = min_length
+
+        # the number of morphemes classified, and how many of those were
+        # classified without fetching a page
+        self.lookups = 0
+        self.avoided = 0
+
+        self.lock = threading.Lock()
+
+    def learn(self, morph, is_affix):
+        '''Record that `morph` was observed to be an affix or a word.'''
+        key = morph.lower()
+
+        with self.lock:
+            counts = self.counts.setdefault(key, [0, 0])
+            counts[is_affix] += 1
+
+            stem = self.basify(key)
+
+            if self._classify(key) is False and len(stem) >= self.min_length:
+                self.stems.add(stem)
+                self.longest = max(self.longest, len(stem))
+
+            else:
+                self.stems.discard(stem)
+
+    def classify(self, morph):
+        '''Say if `morph` is an affix, or return None if unsure.'''
+        key = morph.lower()
+
+        with self.lock:
+            self.lookups += 1
+            is_affix = self._classify(key)
+
+            if is_affix is None and self.segment(key):
+                is_affix = False
+
+            if is_affix is not None:
+                self.avoided += 1
+
+            return is_affix
+
+    def _classify(self, key):
+        '''Say if the morpheme `key` is confidently an affix.'''
+        words, affixes = self.counts.get(key, (0, 0))
+
+        if words and affixes or words + affixes < self.min_count:
+            return None
+
+        return bool(affixes)
+
+    def segment(self, word):
+        '''Segment `word` into two or more known stems, or return None.
+
+        This method finds the segmentation of the basified `word` with the
+        fewest (and so longest) stems by dynamic programming. Only whether
+        such a segmentation exists matters to `self.classify()`; the stems are
+        returned for inspection.
+        '''
+        word = self.basify(word)
+        n = len(word)
+
+        # `best[i]` is the fewest stems spelling out `word[:i]`, and `back[i]`
+        # is where the last of those stems begins
+        best = [0] + [None] * n
+        back = [0] * (n + 1)
+
+        for i in range(1, n + 1):
+            for j in range(max(0, i - self.longest), i - self.min_length + 1):
+                if best[j] is not None and word[j:i] in self.stems:
+                    if best[i] is None or best[j] + 1 < best[i]:
+                        best[i] = best[j] + 1
+                        back[i] = j
+
+        if not best[n] or best[n] < 2:
+            return None
+
+        stems = []
+
+        while n:
+            stems.append(word[back[n]:n])
+            n = back[n]
+
+        stems.reverse()
+
+        return stems
+
+    def basify(self, text):
+        '''Strip `text` of delimiters and make it lowercase.'''
+        return Segmenter.DELIMITERS_P.sub('', text).lower()
+
+    def report(self):
+        '''Return the fraction of classifications that avoided a fetch.'''
+        return 'Segmenter: %s of %s constituent fetches avoided (%.1f%%).' % (
+            self.avoided,
+            self.lookups,
+            100.0 * self.avoided / self.lookups if self.lookups else 0.0)
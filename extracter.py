@@ -2,7 +2,7 @@ import argparse
 
 import extract
 
-from lang import get_lang_and_code
+from lang import WIKI_EN_URL, get_lang_and_code
 
 
 def main():
@@ -13,20 +13,127 @@ def main():
     parser.add_argument('-D', '--debug_fn', default='')
     parser.add_argument('-u', '--url', default=None)
     parser.add_argument('-p', '--find_likely_pos', action='store_true')
+    parser.add_argument('-s', '--sample', type=int, default=None)
+    parser.add_argument('-c', '--confidence', type=float, default=0.95)
+    parser.add_argument('-w', '--workers', type=int, default=8)
+    parser.add_argument('-r', '--regress', default='')
+    parser.add_argument('--record', action='store_true')
+    parser.add_argument('-P', '--pages', default=None)
+    parser.add_argument('--replay', action='store_true')
+    parser.add_argument('-S', '--segment', action='store_true')
+    parser.add_argument('-a', '--affixes', action='store_true')
+    parser.add_argument('--refresh_affixes', action='store_true')
+    parser.add_argument('-R', '--retry_fn', default=None)
+    parser.add_argument('--retry_delay', type=float, default=30)
+    parser.add_argument('--retry', action='store_true')
+    parser.add_argument('-t', '--timeout', type=float, default=10)
+    parser.add_argument('--read_timeout', type=float, default=30)
+    parser.add_argument('-B', '--budget', type=float, default=None)
+    parser.add_argument('--base_url', default=WIKI_EN_URL)
+    parser.add_argument('--wiki_url', default=None)
+    parser.add_argument('-M', '--manifests', default=None)
+    parser.add_argument('--update', action='store_true')
+    parser.add_argument('--diff', action='store_true')
+    parser.add_argument('-C', '--cache_size', type=int, default=0)
+    parser.add_argument('--schedule', type=int, default=0)
     args = parser.parse_args()
 
+    if args.regress and not (args.debug_li or args.debug_fn):
+        parser.error('-r/--regress requires -d/--debug_li or -D/--debug_fn')
+
+    # the segmenter learns from words in whatever order the threads finish
+    # them, which would make the diffs vary from run to run
+    if args.regress and args.segment and args.workers > 1:
+        parser.error('-S/--segment with -r/--regress requires -w/--workers 1')
+
+    if args.record and not args.regress:
+        parser.error('--record requires -r/--regress')
+
+    if args.replay and not args.pages:
+        parser.error('--replay requires -P/--pages')
+
+    if args.retry and not args.retry_fn:
+        parser.error('--retry requires -R/--retry_fn')
+
+    if (args.update or args.diff) and not args.manifests:
+        parser.error('--update and --diff require -M/--manifests')
+
+    # when pointed at a stand-in server (see `stub`), fetch the target
+    # language's Wiktionary from the same server, never from the live one
+    wiki_url = args.wiki_url
+
+    if not wiki_url and args.base_url != WIKI_EN_URL:
+        wiki_url = args.base_url.rstrip('/') + '/native/'
+
     lang, code = get_lang_and_code(args.lang)
     Extract = getattr(extract, code, extract).Extract
-    E = Extract(lang=lang, code=code, grammar_fn=args.grammar_fn)
+    pages = extract.PageCache(args.pages, args.replay) if args.pages else None
+    segmenter = extract.Segmenter() if args.segment else None
+
+    # lemmas that run over `budget` are rescheduled, so they need a queue,
+    # even if only in memory
+    retries = extract.RetryQueue(args.retry_fn, args.retry_delay) \
+        if args.retry_fn or args.budget else None
+
+    # scheduling lemmas only pays off with a cache of constituent pages
+    cache_size = args.cache_size or (1000 if args.schedule else 0)
+    scheduler = extract.Scheduler(args.schedule, cache_size) \
+        if args.schedule else None
+
+    E = Extract(
+        lang=lang,
+        code=code,
+        grammar_fn=args.grammar_fn,
+        pages=pages,
+        segmenter=segmenter,
+        retries=retries,
+        timeout=args.timeout,
+        read_timeout=args.read_timeout,
+        budget=args.budget,
+        base_url=args.base_url,
+        wiki_url=wiki_url,
+        manifests=args.manifests,
+        cache_size=cache_size,
+        scheduler=scheduler,
+        )
     debug_li = args.debug_fn if args.debug_fn else args.debug_li
 
+    # if `affixes` is given, collect the language's affixes in bulk, so that
+    # they can be classified without fetching their pages
+    if args.affixes or args.refresh_affixes:
+        E.preload_affixes(refresh=args.refresh_affixes)
+
+    # if `retry` is given, only retry the words queued in `retry_fn`...
+    if args.retry:
+        E.retry()
+
+    # if `regress` is given, compare the annotations for the words listed in
+    # `debug_li` against the golden file `regress`...
+    elif debug_li and args.regress:
+        E.regress(
+            debug_li=debug_li,
+            golden_fn=args.regress,
+            record=args.record,
+            workers=args.workers,
+            )
+
     # if `debug_li` is given, only extract the words listed in `debug_li`...
-    if debug_li:
+    elif debug_li:
         E.debug(debug_li=debug_li)
 
     # if `find_likely_pos` is given, only extract potential parts of speech...
     elif args.find_likely_pos:
-        E.find_likely_pos()
+        E.find_likely_pos(
+            url=args.url,
+            sample=args.sample,
+            confidence=args.confidence,
+            workers=args.workers,
+            )
+
+    # if `update` or `diff` is given, only extract (or list) the lemmas that
+    # were added since the last snapshot in `manifests`...
+    elif args.update or args.diff:
+        E.update(walk=not args.diff)
 
     # otherwise, scrape Wiktionary for all relevant simplex and complex words
     # in the target language (`lang`)
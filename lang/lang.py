@@ -1,5 +1,9 @@
 import json
+import os
+import time
 
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from urllib.request import urlopen
 from urllib.error import HTTPError, URLError
 
@@ -9,8 +13,18 @@ from bs4 import BeautifulSoup
 
 WIKI_EN_URL = 'https://en.wiktionary.org'
 
+# the url to the list of languages covered on Wiktionary
+LANG_LIST_URL = WIKI_EN_URL + '/wiki/Wiktionary:List_of_languages'
 
-def get_lang_data(fn='lang.json'):
+# the url template for each language's Wiktionary
+WIKI_URL = 'https://%s.wiktionary.org'
+
+# the number of seconds to wait on any single host
+TIMEOUT = 10
+
+
+def get_lang_data(fn='lang.json', max_age=None, workers=16, timeout=TIMEOUT,
+                  lang_list=LANG_LIST_URL, wiki_url=WIKI_URL):
     '''Create a LANGUAGE_DATA dict, write it to `fn`, and return in.
 
     LANGUAGE_DATA maps language codes (e.g., 'fi') to dictionaries containing
@@ -23,6 +37,7 @@ def get_lang_data(fn='lang.json'):
                 "language": "Finnish",
                 "lemmas", "https://...",
                 "wiki": "https://...",
+                "checked": 1538352000,
             }
         }
 
@@ -30,14 +45,25 @@ def get_lang_data(fn='lang.json'):
     covered on Wiktionary:
         https://en.wiktionary.org/wiki/Wiktionary:List_of_languages
 
+    The language Wiktionaries are probed concurrently by `workers` threads,
+    waiting at most `timeout` seconds on each host. "checked" records when
+    each Wiktionary was last probed. If `max_age` is given (in seconds), the
+    entries already in `fn` that were probed within `max_age` seconds are
+    reused rather than probed again.
+
+    `lang_list` and `wiki_url` (a template taking the two-letter code) can be
+    pointed at a local server for testing.
+
     LANGUAGE_DATA is dumped to a json file named `fn`.
     '''
-    lang_list = 'https://en.wiktionary.org/wiki/Wiktionary:List_of_languages'
-    table = BeautifulSoup(urlopen(lang_list), 'html.parser') \
+    cached = load_lang_data(fn) if max_age is not None else {}
+    table = BeautifulSoup(urlopen(lang_list, timeout=timeout), 'html.parser') \
         .find('span', id='Two-letter_codes').parent \
         .find_next_sibling('table')
 
     LANGUAGE_DATA = {}
+    now = int(time.time())
+    stale = []
 
     for row in table.find_all('tr')[1:]:  # skip header row
         code_tag = row.find('code')
@@ -50,22 +76,80 @@ def get_lang_data(fn='lang.json'):
 
         LANGUAGE_DATA[code] = {'language': language, 'lemmas': lemmas}
 
-        try:
-            wiki_url = 'https://%s.wiktionary.org' % code
-            page = BeautifulSoup(urlopen(wiki_url), 'html.parser')
+        # reuse the results of recent probes
+        entry = cached.get(code, {})
+
+        if now - entry.get('checked', 0) <= (max_age or 0):
+            LANGUAGE_DATA[code]['checked'] = entry['checked']
+
+            if 'wiki' in entry:
+                LANGUAGE_DATA[code]['wiki'] = entry['wiki']
+
+        else:
+            stale.append(code)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        probes = executor.map(
+            lambda code: probe_wiki(wiki_url % code, timeout), stale)
+
+        for code, wiki in zip(stale, probes):
+            entry = cached.get(code, {})
+
+            # if the host could not be reached, keep what was known about it
+            if wiki is False:
+                if 'wiki' in entry:
+                    LANGUAGE_DATA[code]['wiki'] = entry['wiki']
+
+                if 'checked' in entry:
+                    LANGUAGE_DATA[code]['checked'] = entry['checked']
+
+                continue
 
-            if 'This wiki has been closed' not in page.text:
-                LANGUAGE_DATA[code]['wiki'] = wiki_url + '/wiki/'
+            if wiki:
+                LANGUAGE_DATA[code]['wiki'] = wiki
 
-        except (HTTPError, URLError):
-            continue
+            LANGUAGE_DATA[code]['checked'] = now
 
     with open(fn, 'w+') as f:
-        json.dump(LANGUAGE_DATA, f, indent=4)
+        json.dump(LANGUAGE_DATA, f, indent=4, sort_keys=True)
 
     return LANGUAGE_DATA
 
 
+def load_lang_data(fn='lang.json'):
+    '''Return the LANGUAGE_DATA dumped to `fn`, or an empty dict.'''
+    try:
+        with open(fn, 'r+') as f:
+            return json.load(f)
+
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def probe_wiki(wiki_url, timeout=TIMEOUT):
+    '''Say if a live Wiktionary is hosted at `wiki_url`.
+
+    This function returns the url to the Wiktionary's pages if the Wiktionary
+    exists and is open, None if it does not exist (i.e., 404) or has been
+    closed, and False if the host could not be reached within `timeout`
+    seconds or answered with any other HTTP error (e.g., 429 or 503).
+    '''
+    try:
+        page = BeautifulSoup(urlopen(wiki_url, timeout=timeout), 'html.parser')
+
+        if 'This wiki has been closed' not in page.text:
+            return wiki_url + '/wiki/'
+
+    # a missing wiki is gone for good, but rate limits and server errors
+    # are not
+    except HTTPError as error:
+        return None if error.code == 404 else False
+
+    # raised by unreachable hosts and timeouts
+    except (URLError, OSError):
+        return False
+
+
 def get_wiki_languages(LANGUAGE_DATA):
     '''Create a bidict WIKI_LANGUAGES mapping language codes to language names.
 
@@ -79,5 +163,26 @@ def get_wiki_languages(LANGUAGE_DATA):
     return bidict({k: v['language'] for k, v in LANGUAGE_DATA.items()})
 
 
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        '-f', '--fn', default=os.path.dirname(__file__) + '/lang.json')
+    parser.add_argument('-a', '--max_age', type=int, default=None)
+    parser.add_argument('-w', '--workers', type=int, default=16)
+    parser.add_argument('-t', '--timeout', type=float, default=TIMEOUT)
+    parser.add_argument('--lang_list', default=LANG_LIST_URL)
+    parser.add_argument('--wiki_url', default=WIKI_URL)
+    args = parser.parse_args()
+
+    get_lang_data(
+        fn=args.fn,
+        max_age=args.max_age,
+        workers=args.workers,
+        timeout=args.timeout,
+        lang_list=args.lang_list,
+        wiki_url=args.wiki_url,
+        )
+
+
 if __name__ == '__main__':
-    get_lang_data()
+    main()
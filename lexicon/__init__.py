@@ -0,0 +1,4 @@
+__all__ = ['Entry', 'Lexicon', 'build_lexicon', 'serve']
+
+
+from .lexicon import Entry, Lexicon, build_lexicon, serve
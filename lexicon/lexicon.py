@@ -0,0 +1,268 @@
+import json
+import mmap
+import re
+import struct
+
+from argparse import ArgumentParser
+from bisect import bisect_left
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# the first bytes of every lexicon file
+MAGIC = b'WCLX'
+VERSION = 1
+
+# the header: magic, version, and the number of forms in the lexicon
+HEADER = struct.Struct('<4sII')
+
+# an offset into the lexicon's records
+OFFSET = struct.Struct('<I')
+
+# for splitting annotations, whether printed (' : ') or buffered (' ; ')
+ANNOTATION_P = re.compile(r' [:;] ')
+
+Entry = namedtuple('Entry', ['form', 'lemma', 'pos', 'segmentations'])
+
+
+def build_lexicon(data_fn, lexicon_fn):
+    '''Compile the annotations in `data_fn` into a lexicon file `lexicon_fn`.
+
+    `data_fn` is the (ideally cleaned) output of `Extract.walk()`, where each
+    line annotates a form with its part(s) of speech and, if it is a
+    compound, its segmentation(s), e.g.:
+
+        aakkosjärjestys* : N : aakkos=järjestys
+        aakkosjärjestyksen : N : aakkos=järjestyksen
+
+    Lemmas are marked with an asterisk. Lines that are not annotations (e.g.,
+    timestamps) are ignored.
+
+    The lexicon file is a table of forms sorted by their UTF-8 encoding,
+    preceded by the offset of each form's record, so that it can be
+    memory-mapped and binary-searched without being loaded (see `Lexicon`).
+    Each record is the form, a null byte, then the form's entries: one line
+    per entry, with tab-separated lemma flag, part(s) of speech, and
+    segmentations.
+    '''
+    forms = {}
+
+    with open(data_fn, 'r+') as f:
+        for line in f:
+            annotation = ANNOTATION_P.split(line.rstrip('\n'))
+
+            if len(annotation) < 2:
+                continue
+
+            form, pos, segmentations = \
+                annotation[0], annotation[1], annotation[2:]
+            lemma = form.endswith('*')
+
+            if lemma:
+                form = form[:-1]
+
+            entry = '\t'.join(['1' if lemma else '0', pos] + segmentations)
+            entries = forms.setdefault(form.encode('utf-8'), [])
+
+            if entry not in entries:
+                entries.append(entry)
+
+    records = [
+        key + b'\0' + '\n'.join(entries).encode('utf-8')
+        for key, entries in sorted(forms.items())
+        ]
+    offsets = []
+    offset = 0
+
+    for record in records:
+        offsets.append(offset)
+        offset += len(record)
+
+    offsets.append(offset)
+
+    with open(lexicon_fn, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        f.write(b''.join(OFFSET.pack(o) for o in offsets))
+        f.write(b''.join(records))
+
+    return len(records)
+
+
+class Lexicon:
+    '''A read-only, memory-mapped lexicon compiled by `build_lexicon()`.
+
+    Since the lexicon file is memory-mapped rather than read, opening a
+    lexicon is nearly instantaneous and any number of processes can share the
+    same pages of the file through the operating system's page cache.
+
+        >>> with Lexicon('fi.lexicon') as lexicon:
+        ...     lexicon.lookup('aakkosjärjestyksen')
+        [Entry(form='aakkosjärjestyksen', lemma=False, pos='N',
+               segmentations=('aakkos=järjestyksen',))]
+    '''
+
+    def __init__(self, lexicon_fn):
+        with open(lexicon_fn, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.n = HEADER.unpack_from(self.mm, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a lexicon file: %s.' % lexicon_fn)
+
+        # the offsets of the offsets and of the records
+        self.offsets = HEADER.size
+        self.records = HEADER.size + OFFSET.size * (self.n + 1)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        '''Return the `i`th form in the lexicon as UTF-8 bytes.'''
+        start = self.records + OFFSET.unpack_from(
+            self.mm, self.offsets + OFFSET.size * i)[0]
+
+        return self.mm[start:self.mm.find(b'\0', start)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+
+    def lookup(self, form):
+        '''Return the entries for `form`, or an empty list.'''
+        key = form.encode('utf-8')
+        i = bisect_left(self, key)
+
+        if i < self.n and self[i] == key:
+            return self._entries(i)
+
+        return []
+
+    def prefix(self, prefix, limit=None):
+        '''Yield the entries for the forms that begin with `prefix`.
+
+        At most `limit` forms are yielded, in UTF-8 order.
+        '''
+        key = prefix.encode('utf-8')
+        i = bisect_left(self, key)
+        end = self.n if limit is None else min(self.n, i + limit)
+
+        while i < end and self[i].startswith(key):
+            yield from self._entries(i)
+            i += 1
+
+    def _span(self, i):
+        '''Return the start and end of the `i`th record.'''
+        start, = OFFSET.unpack_from(self.mm, self.offsets + OFFSET.size * i)
+        end, = OFFSET.unpack_from(self.mm, self.offsets + OFFSET.size * i + 4)
+
+        return self.records + start, self.records + end
+
+    def _entries(self, i):
+        '''Return the entries in the `i`th record.'''
+        start, end = self._span(i)
+        form, entries = self.mm[start:end].decode('utf-8').split('\0', 1)
+
+        return [
+            Entry(form, lemma == '1', pos, tuple(segmentations))
+            for lemma, pos, *segmentations in
+            (entry.split('\t') for entry in entries.split('\n'))
+            ]
+
+
+def serve(lexicon_fn, host='127.0.0.1', port=8080):
+    '''Serve exact and prefix queries to `lexicon_fn` over HTTP.
+
+    Queries return json lists of entries:
+
+        GET /lookup?q=<form>
+        GET /prefix?q=<prefix>&limit=<limit>
+    '''
+    lexicon = Lexicon(lexicon_fn)
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            q = query.get('q', [''])[0]
+
+            if url.path == '/lookup':
+                entries = lexicon.lookup(q)
+
+            elif url.path == '/prefix':
+                try:
+                    limit = int(query.get('limit', [100])[0])
+
+                except ValueError:
+                    self.send_error(400, 'Invalid limit.')
+                    return
+
+                entries = list(lexicon.prefix(q, limit))
+
+            else:
+                self.send_error(404)
+                return
+
+            body = json.dumps(
+                [e._asdict() for e in entries], ensure_ascii=False) \
+                .encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with ThreadingHTTPServer((host, port), Handler) as server:
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+    lexicon.close()
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-l', '--lexicon_fn')
+    parser.add_argument('-b', '--build', default=None)
+    parser.add_argument('-q', '--query', nargs='*', default=[])
+    parser.add_argument('-x', '--prefix', default=None)
+    parser.add_argument('-s', '--serve', action='store_true')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    # compile the annotations in `build` into a lexicon...
+    if args.build:
+        n = build_lexicon(args.build, args.lexicon_fn)
+        print('%s forms compiled to %s' % (n, args.lexicon_fn))
+
+    if args.serve:
+        serve(args.lexicon_fn, port=args.port)
+
+    elif args.query or args.prefix:
+        with Lexicon(args.lexicon_fn) as lexicon:
+            entries = [e for q in args.query for e in lexicon.lookup(q)]
+
+            if args.prefix:
+                entries.extend(lexicon.prefix(args.prefix))
+
+            for e in entries:
+                print(' : '.join(
+                    [e.form + ('*' if e.lemma else ''), e.pos] +
+                    list(e.segmentations)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+__all__ = ['StubServer', 'SyntheticWiki']
+
+
+from .server import StubServer
+from .synthetic import SyntheticWiki
@@ -0,0 +1,57 @@
+from argparse import ArgumentParser
+
+from .server import StubServer
+from .synthetic import SyntheticWiki
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8000)
+    parser.add_argument('-P', '--pages', default=None)
+    parser.add_argument('--native_url', default=None)
+    parser.add_argument('-l', '--lang', default='Finnish')
+    parser.add_argument('-n', '--synthetic', type=int, default=0)
+    parser.add_argument('--page_kb', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--bandwidth', type=int, default=None)
+    parser.add_argument('--error_rate', type=float, default=0)
+    parser.add_argument('--errors', nargs='*', default=['503'])
+    parser.add_argument('--hang', type=float, default=60)
+    args = parser.parse_args()
+
+    synthetic = SyntheticWiki(
+        args.lang, args.synthetic, args.seed, args.page_kb, args.skew) \
+        if args.synthetic else None
+    server = StubServer(
+        (args.host, args.port),
+        pages=args.pages,
+        native_url=args.native_url,
+        synthetic=synthetic,
+        latency=args.latency,
+        jitter=args.jitter,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        errors=args.errors,
+        hang=args.hang,
+        seed=args.seed,
+        )
+
+    print('Serving on http://%s:%s' % server.server_address[:2])
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    server.server_close()
+    print('%s requests served, %s errors injected.' % (
+        server.requests, server.injected))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import os
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from extract.pages import PageCache, read_error
+from lang import WIKI_EN_URL
+
+
+# the path under which the target language's Wiktionary is served
+NATIVE = '/native/'
+
+
+class StubServer(ThreadingHTTPServer):
+    '''A local stand-in for Wiktionary, for load-testing the scraper.
+
+    The server answers with the pages recorded in `pages` (a PageCache
+    directory; see `Extract.fetch()`), falling back on the pages generated by
+    `synthetic` (a SyntheticWiki), if given. Recorded English Wiktionary
+    pages are served at their original paths, and recorded pages from the
+    target language's Wiktionary (`native_url`) are served under '/native/'.
+    To run the server and point the scraper at it (which implies
+    `--wiki_url http://127.0.0.1:8000/native/`):
+
+        python -m stub -n 10000
+        python extracter.py --base_url http://127.0.0.1:8000
+
+    Every response is delayed by `latency` seconds, give or take `jitter`
+    seconds, and sent at no more than `bandwidth` bytes per second. A
+    fraction `error_rate` of requests instead fail with one of `errors`:
+    an HTTP status code (e.g., 429 or 503), or 'timeout', in which case the
+    server stalls for `hang` seconds and then hangs up without answering.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address, pages=None, native_url=None, synthetic=None,
+                 latency=0, jitter=0, bandwidth=None, error_rate=0,
+                 errors=(503, ), hang=60, seed=None):
+        super().__init__(address, StubHandler)
+        self.pages = PageCache(pages, replay=True) if pages else None
+        self.native_url = native_url
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.errors = errors
+        self.hang = hang
+        self.rng = random.Random(seed)
+
+        # the number of requests served and of errors injected
+        self.requests = 0
+        self.injected = 0
+        self.lock = threading.Lock()
+
+    def get_page(self, path):
+        '''Return the HTTP status code and HTML for `path`.'''
+        if self.pages:
+            if path.startswith(NATIVE) and self.native_url:
+                url = self.native_url + path[len(NATIVE):]
+
+            else:
+                url = WIKI_EN_URL + path
+
+            fn = self.pages.filename(url)
+
+            if os.path.exists(fn):
+                with open(fn, 'rb') as f:
+                    return 200, f.read()
+
+            if os.path.exists(fn + '.err'):
+                return read_error(fn + '.err')[0], b''
+
+        if self.synthetic:
+            url = urlparse(path)
+
+            if url.path == '/w/index.php':
+                pagefrom = parse_qs(url.query).get('pagefrom', ['0'])[0]
+
+                if pagefrom.isdigit():
+                    return 200, self.synthetic.category(int(pagefrom)) \
+                        .encode('utf-8')
+
+            elif url.path.startswith('/wiki/'):
+                html = self.synthetic.lemma(unquote(url.path[len('/wiki/'):]))
+
+                if html:
+                    return 200, html.encode('utf-8')
+
+        return 404, b''
+
+    def draw_error(self):
+        '''Return the error to inject into a request, or None.'''
+        with self.lock:
+            self.requests += 1
+
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.injected += 1
+
+                return self.rng.choice(self.errors)
+
+            return None
+
+    def draw_latency(self):
+        '''Return the seconds to delay a response by.'''
+        with self.lock:
+            return max(0, self.latency + self.rng.uniform(
+                -self.jitter, self.jitter))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    # the number of bytes to send at a time when throttling
+    CHUNK = 16 * 1024
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.draw_latency())
+        error = server.draw_error()
+
+        if error == 'timeout':
+            time.sleep(server.hang)
+            self.close_connection = True
+            return
+
+        if error:
+            self.send_error(int(error))
+            return
+
+        status, body = server.get_page(self.path)
+
+        if status != 200:
+            self.send_error(status)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if not server.bandwidth:
+            self.wfile.write(body)
+            return
+
+        for i in range(0, len(body), self.CHUNK):
+            chunk = body[i:i + self.CHUNK]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / server.bandwidth)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,120 @@
+import random
+
+from urllib.parse import quote
+
+
+# the number of lemmas listed on each category page, as on Wiktionary
+PAGE_SIZE = 200
+
+# for generating pronounceable stems
+CONSONANTS = 'hjklmnprstv'
+VOWELS = 'aeiouyäö'
+
+
+class SyntheticWiki:
+    '''Generate Wiktionary-like pages for a synthetic lexicon.
+
+    The lexicon consists of `n` lemmas in the language `lang`, generated
+    deterministically from `seed`: a third of them are simplex stems and the
+    rest are two-stem compounds, whose etymologies link to their stems. As in
+    real compounding, a few stems head many compounds: heads are drawn from
+    a Pareto distribution over the stems, with shape `skew`. Each
+    lemma page is a noun with an etymology and a small declension table,
+    padded to at least `page_kb` kilobytes to simulate huge pages.
+
+    The category listing is paged like Wiktionary's, `PAGE_SIZE` lemmas at a
+    time, and mirrors the markup that `Extract.iter_category()` expects.
+    '''
+
+    def __init__(self, lang='Finnish', n=10000, seed=0, page_kb=0, skew=1.0):
+        self.lang = lang
+        self.page_kb = page_kb
+
+        rng = random.Random(seed)
+        stems = set()
+
+        while len(stems) < max(2, n // 3):
+            stems.add(''.join(
+                rng.choice(CONSONANTS) + rng.choice(VOWELS)
+                for _ in range(rng.randint(2, 3))))
+
+        stems = sorted(stems)
+
+        # rank the stems by how many compounds they head
+        ranked = stems[:]
+        rng.shuffle(ranked)
+
+        # map each lemma to its constituent stems (or to None, if simplex)
+        self.lemmas = dict.fromkeys(stems)
+
+        while len(self.lemmas) < n:
+            a = rng.choice(stems)
+            b = ranked[min(int(rng.paretovariate(skew)), len(ranked)) - 1]
+            self.lemmas.setdefault(a + b, (a, b))
+
+        self.index = sorted(self.lemmas)
+
+    def category(self, pagefrom=0):
+        '''Return the category page listing lemmas from index `pagefrom`.'''
+        title = 'Category:%s lemmas' % self.lang
+        url = '/w/index.php?title=Category:%s_lemmas' % self.lang
+        lemmas = self.index[pagefrom:pagefrom + PAGE_SIZE]
+        html = ['<html><body>']
+
+        # Wiktionary links to the category in its breadcrumbs
+        html.append('<a href="/wiki/%s" title="%s">%s</a>' % (
+            quote(title.replace(' ', '_')), title, title))
+        html.append('<div id="mw-pages">')
+        html.append('<div class="mw-category-group"><ul>')
+        html.extend(
+            '<li><a href="/wiki/%s" title="%s">%s</a></li>' %
+            (quote(lemma), lemma, lemma) for lemma in lemmas)
+        html.append('</ul></div>')
+
+        if pagefrom:
+            html.append('<a href="%s&amp;pageuntil=%s" title="%s">'
+                        'previous page</a>' % (url, pagefrom, title))
+
+        if pagefrom + PAGE_SIZE < len(self.index):
+            html.append('<a href="%s&amp;pagefrom=%s" title="%s">'
+                        'next page</a>' % (url, pagefrom + PAGE_SIZE, title))
+
+        html.append('</div></body></html>')
+
+        return ''.join(html)
+
+    def lemma(self, word):
+        '''Return the page for `word`, or None if it is not a lemma.'''
+        if word not in self.lemmas:
+            return None
+
+        stems = self.lemmas[word]
+        html = [
+            '<html><body>',
+            '<h2><span class="mw-headline" id="%s">%s</span></h2>' % (
+                self.lang, self.lang),
+            ]
+
+        if stems:
+            html.append(
+                '<h3><span class="mw-headline">Etymology</span></h3><p>%s</p>'
+                % ' +\u200e '.join(
+                    '<i class="Latn mention" lang="x"><a href="/wiki/%s#%s">'
+                    '%s</a></i>' % (quote(stem), self.lang, stem)
+                    for stem in stems))
+
+        html.append('<h3><span class="mw-headline">Noun</span></h3>')
+        html.append('<p><b>%s</b></p>' % word)
+        html.append('<h4><span class="mw-headline">Declension</span></h4>')
+        html.append('<table class="inflection-table"><tr>%s</tr></table>' % (
+            ''.join(
+                '<td><span class="Latn">%s</span></td>' % (word + ending)
+                for ending in ('n', 'ssa', 'sta', 't'))))
+
+        # pad the page with filler outside the target language's section
+        html.append('<h2><span class="mw-headline" id="Other">Other</span>'
+                    '</h2>')
+        html.append('<p>%s</p>' % ('lorem ipsum ' * (self.page_kb * 85)))
+        html.append('</body></html>')
+
+        return ''.join(html)